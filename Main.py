@@ -8,6 +8,8 @@ from app_gui import AppGUI
 from MotionDetector import MotionDetector
 from alert_manager import AlertManager
 from videorecorder import VideoRecorder
+from motion_heatmap import MotionHeatmap
+from capture_manager import CaptureManager
 
 
 class MainSystem:
@@ -16,15 +18,27 @@ class MainSystem:
         self.detector = MotionDetector()
         self.alert_mgr = AlertManager(sound_file="alert.mp3")
         self.recorder = VideoRecorder(output_folder="recordings")
+        self.camera_index = 0
+        self.heatmap = MotionHeatmap(camera_id=self.camera_index, output_folder="recordings")
+        self.capture_mgr = CaptureManager(output_folder="recordings")
 
         self.gui = AppGUI(self.root, self.start, self.stop, self.open_history,
-                          self.toggle_zoning_mode, self.manual_capture, self.manual_record_toggle)
+                          self.toggle_zoning_mode, self.manual_capture, self.manual_record_toggle,
+                          self.toggle_heatmap)
 
         self.cap = None
         self.is_running = False
         self.is_manual_recording = False
+        self.show_heatmap = False
         self.start_time = None
 
+        # Burst capture
+        self.burst_interval_ms = 200
+        self.burst_remaining = 0
+        self.burst_index = 0
+        self.burst_stamp = None
+        self.burst_job = None
+
         self.is_zoning_mode = False;
         self.zone_rect = None
         self.drawing = False;
@@ -40,9 +54,10 @@ class MainSystem:
 
     def start(self):
         if not self.is_running:
-            self.cap = cv2.VideoCapture(0)
+            self.cap = cv2.VideoCapture(self.camera_index)
             self.is_running = True
             self.start_time = time.time()
+            self.heatmap.restart()
             self.process_loop()
 
     def stop(self):
@@ -50,19 +65,40 @@ class MainSystem:
         self.is_manual_recording = False
         if self.cap: self.cap.release()
         self.recorder.stop_recording()
+        self.heatmap.save()
+        self.show_heatmap = False
+        self.burst_remaining = 0
+        if self.burst_job: self.root.after_cancel(self.burst_job)
+        self.burst_job = None
+        self.capture_mgr.clear()
         self.alert_mgr.reset()
         self.gui.reset_dashboard()
         self.zone_rect = None
 
     def manual_capture(self):
-        if self.is_running and self.cap:
-            ret, frame = self.cap.read()
-            if ret:
-                now = datetime.now()
-                path = os.path.abspath(os.path.join("recordings", now.strftime("CAP-%d%m%y-%H%M%S.jpg")))
-                if not os.path.exists("recordings"): os.makedirs("recordings")
-                cv2.imwrite(path, frame)
-                self.gui.push_to_history_queue(path)
+        # Lấy ảnh từ frame đã xử lý gần nhất, không đọc camera lần nữa
+        if not self.is_running or self.burst_remaining > 0: return
+        count = self.gui.scale_burst.get()
+        if count <= 1:
+            path = self.capture_mgr.capture(annotated=self.gui.var_capture_annotated.get())
+            if path: self.gui.push_to_history_queue(path)
+            return
+        self.burst_remaining = count
+        self.burst_index = 1
+        self.burst_stamp = self.capture_mgr.make_stamp()
+        self.burst_step()
+
+    def burst_step(self):
+        self.burst_job = None
+        if not self.is_running or self.burst_remaining <= 0: return
+        path = self.capture_mgr.capture(annotated=self.gui.var_capture_annotated.get(),
+                                        stamp=self.burst_stamp, index=self.burst_index)
+        # Chỉ đưa ảnh đầu tiên của loạt burst vào lịch sử
+        if path and self.burst_index == 1: self.gui.push_to_history_queue(path)
+        self.burst_index += 1
+        self.burst_remaining -= 1
+        if self.burst_remaining > 0:
+            self.burst_job = self.root.after(self.burst_interval_ms, self.burst_step)
 
     def manual_record_toggle(self):
         if not self.is_running: return
@@ -73,6 +109,13 @@ class MainSystem:
             self.gui.btn_record.config(text="● RECORD", bg="white", fg="#dc3545")
             if self.recorder.is_recording: self.recorder.stop_recording()
 
+    def toggle_heatmap(self):
+        self.show_heatmap = not self.show_heatmap
+        if self.show_heatmap:
+            self.gui.btn_heatmap.config(bg="#ffc107", text="▦ HEATMAP ON")
+        else:
+            self.gui.btn_heatmap.config(bg="white", text="▦ HEATMAP")
+
     def open_history(self):
         path = os.path.abspath("recordings")
         if not os.path.exists(path): os.makedirs(path)
@@ -123,8 +166,10 @@ class MainSystem:
     def process_loop(self):
         if self.is_running and self.cap.isOpened():
             ret, frame = self.cap.read()
-            frame = cv2.flip(frame, 1)
             if ret:
+                frame = cv2.flip(frame, 1)
+                keep_raw = self.burst_remaining > 0 or not self.gui.var_capture_annotated.get()
+                self.capture_mgr.update_raw(frame, keep=keep_raw)
                 # 1. Settings
                 min_area_val = self.gui.scale_sens.get()
                 self.detector.set_min_area(min_area_val)
@@ -134,6 +179,7 @@ class MainSystem:
                 # 2. Detect
                 detected = False;
                 detections = []
+                zone_name = "full"
                 if self.zone_rect:
                     zx, zy, zw, zh = self.zone_rect
                     h_img, w_img = frame.shape[:2]
@@ -142,12 +188,17 @@ class MainSystem:
                     zy = max(0, zy);
                     zw = min(zw, w_img - zx);
                     zh = min(zh, h_img - zy)
+                    # Mỗi zone có bộ đếm theo giờ riêng, vẽ lại gần chỗ cũ thì dùng lại bộ đếm cũ
+                    zone_name = self.heatmap.zone_key((zx, zy, zw, zh))
                     if zw > 0 and zh > 0:
                         roi = frame[zy:zy + zh, zx:zx + zw]
                         detected, roi_detections = self.detector.detect(roi)
                         detections = [(rx + zx, ry + zy, rw, rh) for (rx, ry, rw, rh) in roi_detections]
                 else:
                     detected, detections = self.detector.detect(frame)
+                self.heatmap.accumulate(frame)
+                self.heatmap.record_activity(zone_name, detected)
+                self.heatmap.tick()
 
                 # 3. Alert
                 state, level, color = "SAFE", 0, "#28a745"
@@ -171,6 +222,7 @@ class MainSystem:
                     if self.recorder.is_recording: self.recorder.stop_recording()
 
                 # 5. Draw
+                if self.show_heatmap: self.heatmap.render_overlay(frame)
                 box_c = (0, 255, 0)
                 if state == "WARNING":
                     box_c = (0, 255, 255)
@@ -187,17 +239,21 @@ class MainSystem:
                 # 6. Update GUI
                 cv2.putText(frame, datetime.now().strftime("%d/%m/%Y %H:%M:%S"), (frame.shape[1] - 220, 25),
                             cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 0), 2)
+                self.capture_mgr.update_annotated(frame)
                 self.gui_ratio, self.gui_offset_x, self.gui_offset_y = self.gui.update_image(frame)
                 self.gui.update_dashboard(level, state, color, max_time=time_limit)
 
                 # Update Stats
                 runtime = int(time.time() - self.start_time)
+                peak = self.heatmap.peak_hour(zone_name)
+                peak_text = f"{peak:02d}h" if peak is not None else "--"
                 stats_text = (
                     f"Runtime: {runtime // 60:02d}:{runtime % 60:02d}\n"
                     f"Status: {state}\n"
                     f"Min Area Size: {min_area_val}\n"
                     f"Time Limit: {time_limit}s\n"
-                    f"Detected Objs: {len(detections)}"
+                    f"Detected Objs: {len(detections)}\n"
+                    f"Peak Hour ({'zone' if self.zone_rect else 'full'}): {peak_text}"
                 )
                 self.gui.update_stats_text(stats_text)
 
@@ -5,6 +5,8 @@ class MotionDetector:
     def __init__(self):
         self.bg_subtractor = cv2.createBackgroundSubtractorMOG2(history=500, varThreshold=40, detectShadows=False)
         self.min_area = 1000
+        # Mask foreground của frame gần nhất (dùng cho heatmap)
+        self.last_mask = None
 
     # Thay đổi diện tích bắt chuyển động
     def set_min_area(self, val):
@@ -15,6 +17,7 @@ class MotionDetector:
         fg_mask = self.bg_subtractor.apply(blurred)
         _, fg_mask = cv2.threshold(fg_mask, 244, 255, cv2.THRESH_BINARY)
         fg_mask = cv2.morphologyEx(fg_mask, cv2.MORPH_OPEN, None)
+        self.last_mask = fg_mask
 
         contours, _ = cv2.findContours(fg_mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
 
@@ -24,7 +24,7 @@ BORDER_RED = "#dc3545"
 BORDER_BLUE = "#0056b3"
 
 class AppGUI:
-    def __init__(self, root, start_cb, stop_cb, history_cb, zoning_cb, capture_cb, record_cb):
+    def __init__(self, root, start_cb, stop_cb, history_cb, zoning_cb, capture_cb, record_cb, heatmap_cb=None):
         self.root = root
         self.root.title("Advanced Camera Tracking System")
         self.root.configure(bg=COLOR_BG)
@@ -35,6 +35,7 @@ class AppGUI:
         self.zoning_cb = zoning_cb
         self.capture_cb = capture_cb
         self.record_cb = record_cb
+        self.heatmap_cb = heatmap_cb
 
         self.history_paths = [None, None, None, None]
 
@@ -90,6 +91,7 @@ class AppGUI:
         self.btn_capture, _ = create_bordered_btn(btn_container, "CAPTURE", "#000", BORDER_BLUE, self.capture_cb, "📷")
         self.btn_record, self.frm_record = create_bordered_btn(btn_container, "RECORD", "#dc3545", BORDER_BLUE,
                                                                self.record_cb, "●")
+        self.btn_heatmap, _ = create_bordered_btn(btn_container, "HEATMAP", "#000", BORDER_BLUE, self.heatmap_cb, "▦")
         # Spacer 1
         tk.Frame(sidebar, bg=COLOR_SIDEBAR).pack(side="top", fill="y", expand=True)
 
@@ -112,10 +114,22 @@ class AppGUI:
         self.scale_time.set(15)
         self.scale_time.pack(fill="x", padx=5)
 
+        tk.Label(panel_frame, text="Capture Burst (Frames):", bg=COLOR_PANEL_BG, fg=COLOR_TEXT_PANEL,
+                 font=("Arial", 9)).pack(anchor="w", padx=5, pady=(10, 0))
+        self.scale_burst = tk.Scale(panel_frame, from_=1, to=10, orient="horizontal", bg=COLOR_PANEL_BG, fg="black",
+                                    troughcolor="#ddd", highlightthickness=0)
+        self.scale_burst.set(1)
+        self.scale_burst.pack(fill="x", padx=5)
+
+        self.var_capture_annotated = tk.BooleanVar(value=True)
+        tk.Checkbutton(panel_frame, text="Capture with overlays", variable=self.var_capture_annotated,
+                       bg=COLOR_PANEL_BG, fg=COLOR_TEXT_PANEL, activebackground=COLOR_PANEL_BG,
+                       font=("Arial", 9)).pack(anchor="w", padx=5)
+
         tk.Label(panel_frame, text="System Monitor", bg=COLOR_PANEL_BG, fg="#555", font=("Arial", 9, "bold")).pack(
             anchor="w", padx=5, pady=(10, 0))
         self.lbl_stats = tk.Label(panel_frame, text="Ready...", bg="white", fg="black", font=("Consolas", 9),
-                                  justify="left", anchor="nw", height=5, bd=1, relief="sunken")
+                                  justify="left", anchor="nw", height=6, bd=1, relief="sunken")
         self.lbl_stats.pack(fill="x", padx=5, pady=5)
 
         # Spacer 2
@@ -207,6 +221,7 @@ class AppGUI:
         self.lbl_video.configure(image='')
         self.btn_zoning.config(bg="white", fg="#0056b3")
         self.btn_record.config(bg="white", text="● RECORD")
+        self.btn_heatmap.config(bg="white", text="▦ HEATMAP")
 
     def update_dashboard(self, level, state, color, max_time=15.0):
         self.lbl_status.config(text=state, bg=color)
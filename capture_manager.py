@@ -0,0 +1,51 @@
+import cv2
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+
+class CaptureManager:
+    """
+    Giữ bản sao frame mới nhất (gốc và đã vẽ) để nút CAPTURE không phải đọc camera,
+    việc mã hoá JPEG được đẩy sang thread pool để không làm chậm vòng lặp chính.
+    """
+
+    def __init__(self, output_folder="recordings", max_workers=2):
+        self.output_folder = output_folder
+        if not os.path.exists(output_folder):
+            os.makedirs(output_folder)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.latest_raw = None
+        self.latest_annotated = None
+
+    def update_raw(self, frame, keep=True):
+        # Phải copy vì vòng lặp sẽ vẽ trực tiếp lên frame này, nên chỉ copy khi cần ảnh gốc
+        self.latest_raw = frame.copy() if keep else None
+
+    def update_annotated(self, frame):
+        # Frame đã vẽ xong, cap.read() lần sau tạo mảng mới nên không cần copy
+        self.latest_annotated = frame
+
+    def clear(self):
+        self.latest_raw = None
+        self.latest_annotated = None
+
+    @staticmethod
+    def make_stamp():
+        # Thêm mili giây vì capture giờ trả về ngay, 2 lần bấm trong 1 giây không được trùng tên
+        return datetime.now().strftime("%d%m%y-%H%M%S-%f")[:-3]
+
+    def capture(self, annotated=True, stamp=None, index=None):
+        """
+        Lưu frame mới nhất ra JPG ở background, trả về đường dẫn (hoặc None nếu chưa có frame).
+        stamp/index: dùng chung stamp cho cả loạt burst, index để phân biệt từng ảnh.
+        """
+        frame = self.latest_annotated if annotated else self.latest_raw
+        if frame is None:
+            return None
+        if stamp is None:
+            stamp = self.make_stamp()
+        filename = f"CAP-{stamp}.jpg" if index is None else f"CAP-{stamp}-{index:02d}.jpg"
+        path = os.path.abspath(os.path.join(self.output_folder, filename))
+        self.executor.submit(cv2.imwrite, path, frame)
+        return path
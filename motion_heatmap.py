@@ -0,0 +1,206 @@
+import cv2
+import numpy as np
+import os
+import time
+from datetime import datetime
+
+from MotionDetector import MotionDetector
+
+
+class MotionHeatmap:
+    """
+    Heatmap chuyển động tích luỹ dần từ foreground mask, lưu ở độ phân giải thấp.
+    Kèm thống kê số frame có chuyển động theo từng giờ cho mỗi vùng.
+    """
+
+    def __init__(self, camera_id=0, output_folder="recordings", scale=8, detect_scale=4,
+                 half_life_hours=6.0, save_interval=1200, warmup=15, max_zones=8):
+        self.camera_id = camera_id
+        self.output_folder = output_folder
+        if not os.path.exists(output_folder):
+            os.makedirs(output_folder)
+        self.path = os.path.join(output_folder, f"heatmap_cam{camera_id}.npz")
+
+        self.scale = scale                    # Thu nhỏ mask scale lần mỗi chiều
+        self.detect_scale = detect_scale      # Thu nhỏ frame trước khi chạy MOG2 riêng của heatmap
+        self.half_life = half_life_hours * 3600  # Sau mỗi chu kỳ này (giây, theo đồng hồ) heatmap chia đôi
+        self.save_interval = save_interval    # Số frame giữa 2 lần ghi xuống đĩa
+        self.warmup = warmup                  # Số frame bỏ qua để MOG2 học nền
+        self.max_zones = max_zones            # Số zone tối đa giữ thống kê theo giờ
+
+        self.heat = None                      # uint16, kích thước (h/scale, w/scale)
+        self.hourly = {}                      # tên vùng -> mảng int32[24]
+        self.frame_count = 0
+        self.last_decay = time.time()
+        self.detector = MotionDetector()
+        self.heat_warmup = warmup
+        self.activity_warmup = warmup
+        self.active_zone = None
+        self.zone_cache = (None, "full")      # (rect gần nhất, key tương ứng)
+        self.load()
+
+    def restart(self):
+        """Gọi khi START: MOG2 coi các frame đầu là foreground nên bỏ qua vài frame."""
+        self.heat_warmup = self.warmup
+        self.activity_warmup = self.warmup
+        self.active_zone = None
+
+    def _ensure_shape(self, frame_size):
+        """frame_size: tuple (width, height) của frame gốc"""
+        w, h = frame_size
+        shape = (max(1, h // self.scale), max(1, w // self.scale))
+        if self.heat is None or self.heat.shape != shape:
+            self.heat = np.zeros(shape, dtype=np.uint16)
+
+    def accumulate(self, frame):
+        """
+        Cộng chuyển động của toàn khung hình vào heatmap.
+        Dùng MOG2 riêng trên frame thu nhỏ để heatmap vẫn thấy cả vùng ngoài zone.
+        """
+        h, w = frame.shape[:2]
+        self._ensure_shape((w, h))
+        small = cv2.resize(frame, (max(1, w // self.detect_scale), max(1, h // self.detect_scale)),
+                           interpolation=cv2.INTER_AREA)
+        self.detector.detect(small)
+        if self.heat_warmup > 0:
+            self.heat_warmup -= 1
+            return
+
+        # INTER_AREA lấy trung bình khối -> ô nào >50% là foreground thì tính là có chuyển động
+        cells = cv2.resize(self.detector.last_mask, (self.heat.shape[1], self.heat.shape[0]),
+                           interpolation=cv2.INTER_AREA)
+        inc = (cells > 127).astype(np.uint16)
+        # cv2.add bão hoà ở 65535 thay vì tràn số
+        self.heat = cv2.add(self.heat, inc)
+
+    @staticmethod
+    def _parse_zone(key):
+        """key dạng zone_<x>_<y>_<w>_<h> (đơn vị ô heatmap) -> tuple, hoặc None nếu không đúng dạng."""
+        parts = key.split("_")
+        if len(parts) != 5 or parts[0] != "zone":
+            return None
+        try:
+            return tuple(int(p) for p in parts[1:])
+        except ValueError:
+            return None
+
+    @staticmethod
+    def _overlap(a, b):
+        """IoU của 2 hình chữ nhật (x, y, w, h)."""
+        ix = max(0, min(a[0] + a[2], b[0] + b[2]) - max(a[0], b[0]))
+        iy = max(0, min(a[1] + a[3], b[1] + b[3]) - max(a[1], b[1]))
+        inter = ix * iy
+        union = a[2] * a[3] + b[2] * b[3] - inter
+        return inter / union if union > 0 else 0.0
+
+    def zone_key(self, rect, min_overlap=0.5):
+        """
+        Trả về key ổn định cho zone: toạ độ được làm tròn theo lưới ô heatmap, và nếu
+        đã có zone lưu trước đó trùng nhiều (IoU >= min_overlap) thì dùng lại zone đó.
+        """
+        if rect is None:
+            return "full"
+        if rect == self.zone_cache[0]:
+            return self.zone_cache[1]
+        x, y, w, h = rect
+        cells = (x // self.scale, y // self.scale, max(1, w // self.scale), max(1, h // self.scale))
+        key = "zone_{}_{}_{}_{}".format(*cells)
+        best = 0.0
+        for name in self.hourly:
+            saved = self._parse_zone(name)
+            if saved is None:
+                continue
+            overlap = self._overlap(cells, saved)
+            if overlap >= min_overlap and overlap > best:
+                best, key = overlap, name
+        self.zone_cache = (rect, key)
+        return key
+
+    def _prune_zones(self, keep=None):
+        """Giữ tối đa max_zones zone, bỏ zone có ít hoạt động nhất (trừ zone keep vừa tạo)."""
+        zones = [name for name in self.hourly if name != "full"]
+        while len(zones) > self.max_zones:
+            candidates = [name for name in zones if name != keep]
+            weakest = min(candidates, key=lambda name: int(self.hourly[name].sum()))
+            zones.remove(weakest)
+            del self.hourly[weakest]
+
+    def record_activity(self, zone_name, detected):
+        # Đổi zone thì ROI đổi kích thước, MOG2 của detector chính phải học nền lại
+        if zone_name != self.active_zone:
+            self.active_zone = zone_name
+            self.activity_warmup = self.warmup
+        if self.activity_warmup > 0:
+            self.activity_warmup -= 1
+            return
+        if zone_name not in self.hourly:
+            self.hourly[zone_name] = np.zeros(24, dtype=np.int32)
+            self._prune_zones(keep=zone_name)
+        if detected:
+            self.hourly[zone_name][datetime.now().hour] += 1
+
+    def tick(self):
+        """Gọi mỗi frame: giảm nhiệt theo thời gian thực và lưu định kỳ."""
+        self.frame_count += 1
+        # Giảm nhiệt theo đồng hồ để không phụ thuộc tốc độ máy, tính cả thời gian app tắt
+        halvings = int((time.time() - self.last_decay) // self.half_life)
+        if halvings > 0:
+            if self.heat is not None:
+                np.right_shift(self.heat, min(halvings, 16), out=self.heat)
+            self.last_decay += halvings * self.half_life
+        if self.frame_count % self.save_interval == 0:
+            self.save()
+
+    def render_overlay(self, frame, alpha=0.4):
+        """Phủ heatmap (đã chuẩn hoá, tô màu JET) lên frame, sửa trực tiếp frame."""
+        if self.heat is None:
+            return frame
+        peak = int(self.heat.max())
+        if peak == 0:
+            return frame
+        norm = cv2.convertScaleAbs(self.heat, alpha=255.0 / peak)
+        color = cv2.applyColorMap(norm, cv2.COLORMAP_JET)
+        color = cv2.resize(color, (frame.shape[1], frame.shape[0]), interpolation=cv2.INTER_LINEAR)
+        # Chỉ phủ màu lên những vùng đã từng có chuyển động
+        mask = cv2.resize(norm, (frame.shape[1], frame.shape[0]), interpolation=cv2.INTER_NEAREST) > 0
+        blended = cv2.addWeighted(frame, 1 - alpha, color, alpha, 0)
+        frame[mask] = blended[mask]
+        return frame
+
+    def peak_hour(self, zone_name):
+        counts = self.hourly.get(zone_name)
+        if counts is None or not counts.any():
+            return None
+        return int(np.argmax(counts))
+
+    def save(self):
+        if self.heat is None:
+            return
+        data = {"heat": self.heat, "last_decay": np.array(self.last_decay)}
+        for name, counts in self.hourly.items():
+            data[f"hourly_{name}"] = counts
+        # Ghi ra file tạm rồi đổi tên để không hỏng file nếu tắt giữa chừng
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, **data)
+        os.replace(tmp_path, self.path)
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with np.load(self.path) as data:
+                self.heat = data["heat"].astype(np.uint16)
+                if "last_decay" in data.files:
+                    self.last_decay = float(data["last_decay"])
+                for key in data.files:
+                    if key.startswith("hourly_"):
+                        name = key[len("hourly_"):]
+                        # Bỏ key không đúng định dạng (ví dụ từ bản cũ)
+                        if name == "full" or self._parse_zone(name) is not None:
+                            self.hourly[name] = data[key].astype(np.int32)
+            self._prune_zones()
+        except Exception as e:
+            print("Error loading heatmap:", e)
+            self.heat = None
+            self.hourly = {}
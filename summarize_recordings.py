@@ -0,0 +1,208 @@
+import argparse
+import cv2
+import glob
+import json
+import os
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from multiprocessing import Pool, cpu_count
+
+from MotionDetector import MotionDetector
+
+CHECKPOINT_FILE = "checkpoint.json"
+
+
+def parse_clip_start(path):
+    """Lấy thời điểm bắt đầu clip từ tên file của VideoRecorder, nếu không được thì dùng mtime."""
+    try:
+        return datetime.strptime(os.path.basename(path), "%d-%m-%Y-%H-%M-%S.mp4")
+    except ValueError:
+        return datetime.fromtimestamp(os.path.getmtime(path))
+
+
+def estimate_real_fps(path, start, header_fps, frame_count):
+    """
+    VideoRecorder luôn ghi header 20 fps nhưng thực tế ghi theo tốc độ của process_loop.
+    Ước lượng fps thật từ số frame và khoảng thời gian giữa tên file (lúc bắt đầu) và mtime (lúc đóng file).
+    """
+    duration = os.path.getmtime(path) - start.timestamp()
+    if frame_count > 0 and duration > 0:
+        return frame_count / duration
+    return header_fps
+
+
+def _init_worker():
+    # Mỗi process chỉ dùng 1 luồng OpenCV để các worker không tranh CPU của nhau
+    cv2.setNumThreads(1)
+
+
+def summarize_clip(job):
+    """
+    Chạy trong worker process: giải mã 1 clip, phát hiện chuyển động trên bản thu nhỏ
+    và chỉ ghi lại các đoạn có chuyển động (kèm timestamp) vào video tóm tắt.
+    Lỗi của 1 clip được trả về trong kết quả thay vì làm dừng cả batch.
+    """
+    try:
+        return _summarize_clip(job)
+    except Exception as e:
+        return {"src": job[0], "error": str(e)}
+
+
+def _summarize_clip(job):
+    src, output_folder, downscale, min_area, pre_roll, hangover, warmup = job
+    t0 = time.time()
+    name = os.path.splitext(os.path.basename(src))[0]
+    out_path = os.path.join(output_folder, f"{name}-summary.mp4")
+    tmp_path = os.path.join(output_folder, f"{name}-summary.part.mp4")
+
+    cap = cv2.VideoCapture(src)
+    writer = None
+    done = False
+    try:
+        if not cap.isOpened():
+            raise RuntimeError(f"cannot open {src}")
+        fps = cap.get(cv2.CAP_PROP_FPS) or 20.0
+        start = parse_clip_start(src)
+        real_fps = estimate_real_fps(src, start, fps, int(cap.get(cv2.CAP_PROP_FRAME_COUNT)))
+
+        detector = MotionDetector()
+        # Diện tích tỉ lệ theo bình phương hệ số thu nhỏ
+        detector.set_min_area(min_area / (downscale * downscale))
+
+        buffer = deque(maxlen=pre_roll)
+        frames = kept = remaining = 0
+
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            small = cv2.resize(frame, None, fx=1.0 / downscale, fy=1.0 / downscale, interpolation=cv2.INTER_AREA)
+            motion, _ = detector.detect(small)
+            # MOG2 cần vài frame đầu để học nền
+            if motion and frames >= warmup:
+                remaining = hangover
+
+            stamp = start + timedelta(seconds=frames / real_fps)
+            cv2.putText(frame, stamp.strftime("%d/%m/%Y %H:%M:%S"), (10, frame.shape[0] - 15),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
+            frames += 1
+
+            if remaining > 0:
+                if writer is None:
+                    fourcc = cv2.VideoWriter_fourcc(*'mp4v')
+                    writer = cv2.VideoWriter(tmp_path, fourcc, fps, (frame.shape[1], frame.shape[0]))
+                    if not writer.isOpened():
+                        raise RuntimeError(f"cannot open writer for {tmp_path}")
+                while buffer:
+                    writer.write(buffer.popleft())
+                    kept += 1
+                writer.write(frame)
+                kept += 1
+                remaining -= 1
+            else:
+                buffer.append(frame)
+
+        if frames == 0:
+            # Clip hỏng/đang ghi dở: báo lỗi để không bị ghi checkpoint và được thử lại lần sau
+            raise RuntimeError(f"no frames decoded from {src}")
+        done = True
+    finally:
+        # Worker còn sống sau clip này nên phải trả handle, và không để lại file .part khi lỗi
+        cap.release()
+        if writer is not None:
+            writer.release()
+        if not done and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    summary = None
+    if writer is not None:
+        # Chỉ đổi tên khi ghi xong để file dở dang không bị coi là hoàn tất
+        os.replace(tmp_path, out_path)
+        summary = out_path
+
+    return {"src": src, "summary": summary, "frames": frames, "kept": kept, "seconds": time.time() - t0}
+
+
+def load_checkpoint(path):
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print("Error loading checkpoint:", e)
+        return {}
+
+
+def save_checkpoint(path, data):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def clip_signature(path):
+    st = os.stat(path)
+    return {"size": st.st_size, "mtime": st.st_mtime}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tạo video tóm tắt chỉ gồm các đoạn có chuyển động.")
+    parser.add_argument("--input", default="recordings", help="Thư mục chứa clip .mp4")
+    parser.add_argument("--output", default=os.path.join("recordings", "summaries"))
+    parser.add_argument("--workers", type=int, default=cpu_count())
+    parser.add_argument("--downscale", type=int, default=4, help="Thu nhỏ frame N lần trước khi phát hiện")
+    parser.add_argument("--min-area", type=int, default=1000, help="Diện tích tối thiểu trên frame gốc")
+    parser.add_argument("--pre-roll", type=int, default=10, help="Số frame giữ lại trước chuyển động")
+    parser.add_argument("--hangover", type=int, default=40, help="Số frame giữ lại sau chuyển động")
+    parser.add_argument("--warmup", type=int, default=15, help="Số frame đầu bỏ qua để học nền")
+    args = parser.parse_args()
+    if args.downscale < 1:
+        parser.error("--downscale must be >= 1")
+
+    if not os.path.exists(args.output):
+        os.makedirs(args.output)
+    checkpoint_path = os.path.join(args.output, CHECKPOINT_FILE)
+    checkpoint = load_checkpoint(checkpoint_path)
+
+    # Bỏ qua clip đã xử lý và chưa thay đổi kể từ lần chạy trước
+    jobs = []
+    for src in sorted(glob.glob(os.path.join(args.input, "*.mp4"))):
+        key = os.path.abspath(src)
+        done = checkpoint.get(key)
+        if done and done["size"] == os.path.getsize(src) and done["mtime"] == os.path.getmtime(src):
+            continue
+        jobs.append((src, args.output, args.downscale, args.min_area, args.pre_roll, args.hangover, args.warmup))
+
+    print(f"{len(jobs)} clip(s) to process, {len(checkpoint)} already done")
+    if not jobs:
+        return
+
+    workers = max(1, min(args.workers, len(jobs)))
+    total_frames = failed = 0
+    t0 = time.time()
+    with Pool(workers, initializer=_init_worker) as pool:
+        for result in pool.imap_unordered(summarize_clip, jobs):
+            src = result["src"]
+            if "error" in result:
+                # Không ghi checkpoint để lần chạy sau thử lại
+                failed += 1
+                print(f"{os.path.basename(src)}: error: {result['error']}")
+                continue
+            checkpoint[os.path.abspath(src)] = dict(clip_signature(src), summary=result["summary"],
+                                                    frames=result["frames"], kept=result["kept"])
+            save_checkpoint(checkpoint_path, checkpoint)
+            total_frames += result["frames"]
+            clip_fps = result["frames"] / result["seconds"] if result["seconds"] > 0 else 0
+            print(f"{os.path.basename(src)}: kept {result['kept']}/{result['frames']} frames "
+                  f"({clip_fps:.1f} fps) -> {result['summary'] or 'no motion'}")
+
+    elapsed = time.time() - t0
+    fps_per_core = total_frames / elapsed / workers if elapsed > 0 else 0
+    print(f"Done: {total_frames} frames in {elapsed:.1f}s on {workers} worker(s) "
+          f"= {fps_per_core:.1f} fps/core, {failed} failed")
+
+
+if __name__ == "__main__":
+    main()